@@ -14,24 +14,15 @@
 """
 
 import argparse
-import Foundation
-import importlib
+import functools
 import logging
 import os
-import platform
 import plistlib
 import re
-import shlex
-import shutil
 import signal
 import subprocess
 import sys
-
-from AppKit import (
-    CFPreferencesCopyAppValue, NSAlert, NSApp,
-    NSImage, NSInformationalAlertStyle, NSObject
-)
-from PyObjCTools import AppHelper
+import time
 
 
 __version__ = "1.2.0"
@@ -42,9 +33,14 @@ def log_setup():
 
     # Create logger
     logger = logging.getLogger("AppBlocker")
+
+    # Don't add the handlers twice
+    if logger.handlers:
+        return
+
     logger.setLevel(logging.DEBUG)
-    # Create file handler which logs even debug messages
-    file_handler = logging.FileHandler("/var/log/AppBlocker.log")
+    # Create file handler which logs even debug messages, only opening the file once a record is written
+    file_handler = logging.FileHandler("/var/log/AppBlocker.log", delay=True)
     file_handler.setLevel(logging.INFO)
     # Create console handler with a higher log level
     console_handler = logging.StreamHandler()
@@ -58,53 +54,59 @@ def log_setup():
     logger.addHandler(console_handler)
 
 
-# Initialize logging
-log_setup()
 logger = logging.getLogger("AppBlocker")
 
 
-def execute_process(command, input=None, use_shell=False):
+def execute_process_quietly(command):
     """
-    A helper function for subprocess.
+    A helper function for subprocess when only the exit code is needed.
+
+    No pipes are set up; stdin, stdout and stderr are all /dev/null.
 
     Args:
-        command (str):  The command line level syntax that would be written in a
-            shell script or a terminal window
+        command (list):  The arguments of the command to run
 
     Returns:
-        dict:  Results in a dictionary
+        int:  The exit code of the command
     """
 
-    # Validate that command is not a string
-    if not isinstance(command, str):
-        raise TypeError("Command must be a str type")
+    return subprocess.run(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=False
+    ).returncode
 
-    if not use_shell:
-        # Format the command
-        command = shlex.split(command)
 
-    # Run the command
-    process = subprocess.Popen(
-        command,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        shell=use_shell,
-        universal_newlines=True
-    )
+def get_os_version():
+    """Get the macOS version from the kernel instead of parsing SystemVersion.plist.
 
-    if input:
-        (stdout, stderr) = process.communicate(input=input)
+    Returns:
+        tuple:  The major and minor version numbers, e.g. (10, 15) or (13, 0)
+    """
 
-    else:
-        (stdout, stderr) = process.communicate()
+    import ctypes
 
-    return {
-        "stdout": (stdout).strip(),
-        "stderr": (stderr).strip() if stderr != None else None,
-        "exitcode": process.returncode,
-        "success": True if process.returncode == 0 else False
-    }
+    try:
+        libc = ctypes.CDLL("/usr/lib/libc.dylib", use_errno=True)
+        size = ctypes.c_size_t(32)
+        buffer = ctypes.create_string_buffer(size.value)
+
+        # kern.osproductversion is only available on macOS 10.13.4 and newer
+        if libc.sysctlbyname(b"kern.osproductversion", buffer, ctypes.byref(size), None, 0) != 0:
+            raise OSError(ctypes.get_errno(), "sysctlbyname failed")
+
+        os_version = buffer.value.decode()
+
+    except OSError:
+        import platform
+        os_version = platform.mac_ver()[0]
+
+    major, _, rest = os_version.partition(".")
+    minor = rest.partition(".")[0]
+
+    return int(major), int(minor or 0)
 
 
 def create_daemon(**parameters):
@@ -127,149 +129,329 @@ def create_daemon(**parameters):
             "--domain",
             launch_daemon_label
         ],
-        "KeepAlive": True,
+        # Only restart the daemon if it exits abnormally
+        "KeepAlive": {
+            "SuccessfulExit": False,
+            "Crashed": True
+        },
         "RunAtLoad": True
     }
 
     # Write the LaunchDaemon configuration to disk
-    plistlib.dump(launch_daemon_plist, launch_daemon_location)
+    with open(launch_daemon_location, "wb") as launch_daemon_file:
+        plistlib.dump(launch_daemon_plist, launch_daemon_file, fmt=plistlib.FMT_BINARY)
 
 
 def start_daemon(**parameters):
-    """Check if the LaunchDaemon is running, if so restart
-    it in case a change was made to the plist file."""
+    """Load the LaunchDaemon if it is not already running.
+
+    launchctl refuses to load a service that is already loaded, so it is
+    asked to load it directly instead of checking its state first."""
 
     # Setup local variables for ease
     launch_daemon_location = parameters.get("launch_daemon_location")
     launch_daemon_label = parameters.get("launch_daemon_label")
-    os_minor_version = parameters.get("os_minor_version")
+    os_version = parameters.get("os_version")
 
     # Determine proper launchctl syntax based on OS Version
-    if os_minor_version >= 11:
-        exit_code = execute_process(
-            f"/bin/launchctl print system/{launch_daemon_label} > /dev/null 2>&1; echo $?"
-        ).get("exitcode")
-
-        if int(exit_code) != 0:
-            logger.info("Loading LaunchDaemon...")
-            execute_process(f"/bin/launchctl bootstrap system {launch_daemon_location}")
-
-        execute_process(f"/bin/launchctl enable system/{launch_daemon_label}")
+    if os_version >= (10, 11):
+        # A disabled service can't be bootstrapped, so enable it first
+        execute_process_quietly(["/bin/launchctl", "enable", f"system/{launch_daemon_label}"])
 
-    elif os_minor_version <= 10:
-        exit_code = execute_process(
-            f"/bin/launchctl list {launch_daemon_label} > /dev/null 2>&1; echo $?").get("exitcode")
+        if execute_process_quietly(
+            ["/bin/launchctl", "bootstrap", "system", launch_daemon_location]) == 0:
+            logger.info("Loaded the LaunchDaemon.")
 
-        if int(exit_code) != 0:
-            logger.info("Loading LaunchDaemon...")
-            execute_process(f"/bin/launchctl load {launch_daemon_location}")
+    else:
+        if execute_process_quietly(
+            ["/bin/launchctl", "load", launch_daemon_location]) == 0:
+            logger.info("Loaded the LaunchDaemon.")
 
 
 def stop_daemon(**parameters):
-    """Check if the LaunchDaemon is running and stop it if so."""
+    """Stop the LaunchDaemon if it is running.
+
+    launchctl fails harmlessly for a service that isn't loaded, so it is
+    asked to stop it directly instead of checking its state first."""
 
     # Setup local variables for ease
     launch_daemon_location = parameters.get("launch_daemon_location")
     launch_daemon_label = parameters.get("launch_daemon_label")
-    os_minor_version = parameters.get("os_minor_version")
+    os_version = parameters.get("os_version")
 
     # Determine proper launchctl syntax based on OS Version
-    if os_minor_version >= 11:
-        exit_code = execute_process(
-            f"/bin/launchctl print system/{launch_daemon_label} > /dev/null 2>&1; echo $?"
-        ).get("exitcode")
+    if os_version >= (10, 11):
+        if execute_process_quietly(
+            ["/bin/launchctl", "bootout", f"system/{launch_daemon_label}"]) == 0:
+            logger.info("Stopped the LaunchDaemon.")
 
-        if int(exit_code) == 0:
-            logger.info("Stopping the LaunchDaemon...")
-            execute_process(f"/bin/launchctl bootout system/{launch_daemon_label}")
+    else:
+        if execute_process_quietly(
+            ["/bin/launchctl", "unload", launch_daemon_label]) == 0:
+            logger.info("Stopped the LaunchDaemon.")
 
-    elif os_minor_version <= 10:
-        exit_code = execute_process(
-            f"/bin/launchctl list {launch_daemon_label} > /dev/null 2>&1; echo $?").get("exitcode")
 
-        if int(exit_code) == 0:
-            logger.info("Stopping the LaunchDaemon...")
-            execute_process(f"/bin/launchctl unload {launch_daemon_label}")
+# The dynamic store session and the last console user are reused between block events
+console_user_cache = {"store": None, "user": None, "expires": 0}
 
 
-class AppLaunch(NSObject):
-    """Define callback for notification"""
+def get_console_user(ttl=5):
+    """Get the user currently logged in at the console.
 
-    def __init__(self):
-        super(NSObject, self).__init__()
-        self.preference_domain = None
+    Args:
+        ttl (int, optional):  Seconds to reuse the previous result for
 
-    def appLaunched_(self, notification):
+    Returns:
+        str:  The console user's name or None if no user is logged in
+    """
 
-        # Get all the configured Applications
-        blocked_apps = list(CFPreferencesCopyAppValue("BlockedApps", self.preference_domain))
+    if time.monotonic() < console_user_cache["expires"]:
+        return console_user_cache["user"]
 
-        # List of all blocked bundle identifiers. Can use Regex strings.
-        blocked_bundle_identifiers = [
-            blockedBundleID["Application"] for blockedBundleID in blocked_apps ]
+    from SystemConfiguration import SCDynamicStoreCopyConsoleUser, SCDynamicStoreCreate
 
-        # Combine all bundle identifiers and Regex strings to one
-        blocked_bundle_identifiers_combined = "(" + ")|(".join(blocked_bundle_identifiers) + ")"
+    if console_user_cache["store"] is None:
+        console_user_cache["store"] = SCDynamicStoreCreate(None, "AppBlocker", None, None)
 
-        # Store the userInfo dict from the notification
-        user_info = notification.userInfo
+    console_user, _, _ = SCDynamicStoreCopyConsoleUser(console_user_cache["store"], None, None)
 
-        # Get the launched applications bundle identifier
-        bundle_identifier = user_info()["NSApplicationBundleIdentifier"]
+    if console_user == "loginwindow":
+        console_user = None
 
-        # Check if launched app's bundle identifier matches any 'blocked_bundle_identifiers'
-        if re.match(blocked_bundle_identifiers_combined, bundle_identifier):
+    console_user_cache["user"] = console_user
+    console_user_cache["expires"] = time.monotonic() + ttl
 
-            app_name = user_info()["NSApplicationName"]
+    return console_user
 
-            for blocked_list in blocked_apps:
-                if blocked_list["Application"] == bundle_identifier:
-                    blocked_app = blocked_list
 
-            console_user = (execute_process(
-                "/usr/sbin/scutil <<< \'show State:/Users/ConsoleUser\' | /usr/bin/awk \'/Name :/ && ! /loginwindow/ { print $3 }\'",
-                use_shell=True
-            )).get("stdout")
-            logger.info(
-                f"Restricted application '{app_name}' matching bundleID '{bundle_identifier}' was opened by {console_user}.")
+# Characters that make a bundle identifier a Regex string rather than a literal.
+# Dots are excluded as every bundle identifier contains them.
+REGEX_CHARACTERS = re.compile(r"[\^$*+?()\[\]{}|\\]")
 
-            # Get path of launched app
-            path = user_info()["NSApplicationPath"]
 
-            # Get PID of launched app
-            pid = user_info()["NSApplicationProcessIdentifier"]
+def literal_prefix(pattern):
+    """Get the literal text every match of a Regex string has to start with.
 
-            # Quit launched app
-            os.kill(pid, signal.SIGKILL)
+    Args:
+        pattern (str):  A Regex string
 
-            # Alert user
-            if blocked_app["AlertUser"]:
+    Returns:
+        str:  The literal prefix, which may be empty
+    """
 
-                try:
-                    app_icon = CFPreferencesCopyAppValue(
-                        "CFBundleIconFile", f"{path}/Contents/Info.plist")
-                    alert_icon_path = f"{path}/Contents/Resources/{app_icon}"
-                    _, ext = os.path.splitext(alert_icon_path)
+    # An alternation can make any prefix optional
+    if "|" in pattern:
+        return ""
 
-                    if not ext:
-                        alert_icon_path += ".icns"
+    prefix = ""
+    index = 0
 
-                except Exception:
-                    alert_icon_path = None
+    while index < len(pattern):
+        character = pattern[index]
 
-                alert(
-                    blocked_app["AlertTitle"].format(appname=app_name),
-                    blocked_app["AlertMessage"],
-                    ["OK"],
-                    alert_icon_path
-                )
+        if character == "\\" and index + 1 < len(pattern) and not pattern[index + 1].isalnum():
+            # An escaped punctuation character is literal, e.g. "\."
+            character = pattern[index + 1]
+            index += 2
 
-            # Delete app if blocked
-            if blocked_app["DeleteApp"]:
-                try:
-                    shutil.rmtree(path)
-                except OSError as error:
-                    print (f"Error: {error.filename} - {error.strerror}.")
+        elif character in ".^$*+?()[]{}\\":
+            break
+
+        else:
+            index += 1
+
+        # A quantifier can make this character optional
+        if index < len(pattern) and pattern[index] in "*?{":
+            break
+
+        prefix += character
+
+    return prefix
+
+
+# Regex strings that can't share a combined pattern.  Before Python 3.11 an inline
+# global flag such as "(?i)" applies to the whole pattern rather than raising an error,
+# and the group around each Regex string renumbers what a numbered backreference points to.
+UNCOMBINABLE_REGEX = re.compile(r"\(\?[aiLmsux]+\)|\\[1-9]")
+
+
+class RegexPattern(object):
+    """Match a bundle identifier against many Regex strings, combined into one re pattern where possible"""
+
+    def __init__(self, patterns):
+        # Wrap each Regex string in a group and note its number to tell which one matched
+        self.indexes = {}
+        group = 1
+
+        for index, pattern in enumerate(patterns):
+            self.indexes[group] = index
+            group += re.compile(pattern, re.ASCII).groups + 1
+
+        self.pattern = None
+        self.patterns = None
+
+        if any(UNCOMBINABLE_REGEX.search(pattern) for pattern in patterns):
+            logger.debug("Unable to combine the Regex strings:  inline flags or numbered backreferences")
+
+        else:
+            try:
+                self.pattern = re.compile("|".join(f"({pattern})" for pattern in patterns), re.ASCII)
+            except re.error as error:
+                # e.g. two Regex strings use the same group name
+                logger.debug(f"Unable to combine the Regex strings:  {error}")
+
+        # Each Regex string is checked on its own when they can't be combined
+        if self.pattern is None:
+            self.patterns = [ re.compile(pattern, re.ASCII) for pattern in patterns ]
+
+    def match(self, string):
+        """Get the index of the first Regex string that matches.
+
+        Args:
+            string (str):  The bundle identifier
+
+        Returns:
+            int:  The index of the Regex string or None if none match
+        """
+
+        if self.pattern is None:
+            for index, pattern in enumerate(self.patterns):
+                if pattern.fullmatch(string):
+                    return index
+
+            return None
+
+        # The alternatives are tried in order and a group closes after any it contains,
+        # so the last group to match is the one around the first matching Regex string
+        match = self.pattern.fullmatch(string)
+
+        return self.indexes[match.lastindex] if match else None
+
+
+def load_blocked_apps(preference_domain):
+    """Read the block list from the managed preference domain and build the
+    lookups used when an application is launched.
+
+    Args:
+        preference_domain (str):  The preference domain of the block list
+
+    Returns:
+        tuple:  A dict of the block list entries keyed by their literal bundle
+            identifier, a single compiled pattern combining every Regex string
+            (or None if there are none), a list of (compiled pattern, entry)
+            tuples for the entries that use a Regex string and a tuple of the
+            literal prefixes of those Regex strings
+    """
+
+    from AppKit import CFPreferencesAppSynchronize, CFPreferencesCopyAppValue
+
+    literal_rules = {}
+    regex_rules = []
+
+    # Make sure the latest values of the managed preference domain are read
+    CFPreferencesAppSynchronize(preference_domain)
+
+    # Walk the configured Applications in a single pass without copying them to a list first
+    for blocked_app in CFPreferencesCopyAppValue("BlockedApps", preference_domain) or []:
+        bundle_identifier = blocked_app["Application"]
+
+        if not REGEX_CHARACTERS.search(bundle_identifier):
+            literal_rules[bundle_identifier] = blocked_app
+            continue
+
+        try:
+            regex_rules.append((re.compile(bundle_identifier, re.ASCII), blocked_app))
+        except re.error as error:
+            logger.error(f"Invalid Regex string '{bundle_identifier}':  {error}")
+
+    # Combine all Regex strings to one so a launch is a single check that reports the matching entry
+    regex_pattern = None
+
+    if regex_rules:
+        regex_pattern = RegexPattern([ pattern.pattern for pattern, _ in regex_rules ])
+
+    # Launches that don't start with any of these can't match a Regex string
+    regex_prefixes = tuple({ literal_prefix(pattern.pattern) for pattern, _ in regex_rules })
+
+    return literal_rules, regex_pattern, regex_rules, regex_prefixes
+
+
+def delete_app(path):
+    """Delete an application bundle.
+
+    Args:
+        path (str):  The path to the application bundle
+    """
+
+    from Foundation import NSFileManager, NSURL
+
+    success, error = NSFileManager.defaultManager().removeItemAtURL_error_(
+        NSURL.fileURLWithPath_(path), None)
+
+    if not success:
+        logger.error(f"Error: {path} - {error.localizedDescription()}.")
+
+
+def observe_launches(app_blocker):
+    """Register for launch notifications only while applications are blocked.
+
+    NSWorkspace cannot filter its launch notifications by bundle identifier,
+    so with an empty block list the observer is removed entirely rather
+    than waking for every application launch.
+
+    Args:
+        app_blocker (AppLaunch):  The observer for the launch notifications
+    """
+
+    from AppKit import NSWorkspace
+
+    notification_center = NSWorkspace.sharedWorkspace().notificationCenter()
+    notification_center.removeObserver_name_object_(
+        app_blocker, "NSWorkspaceWillLaunchApplicationNotification", None)
+
+    if app_blocker.literal_rules or app_blocker.regex_rules:
+        # Register for 'NSWorkspaceWillLaunchApplicationNotification' notifications
+        notification_center.addObserver_selector_name_object_(
+            app_blocker, "appLaunched:", "NSWorkspaceWillLaunchApplicationNotification", None)
+
+    else:
+        logger.info("No applications are blocked; not monitoring launches.")
+
+
+def get_app_icon(path):
+    """Get an application's icon file, reusing it when the same app is blocked again.
+
+    Args:
+        path (str):  The path to the application bundle
+
+    Returns:
+        NSURL:  The application's icon file or None if the app doesn't have one
+    """
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    # A different app copied to the same path gets a new inode, so it won't reuse the old icon
+    return load_app_icon(path, stat.st_ino, stat.st_mtime)
+
+
+@functools.lru_cache(maxsize=32)
+def load_app_icon(path, inode, modified):
+    """Find an application's icon file; the inode and modification time only key the cache"""
+
+    from Foundation import NSBundle
+
+    bundle = NSBundle.bundleWithPath_(path)
+
+    if bundle is None or not bundle.objectForInfoDictionaryKey_("CFBundleIconFile"):
+        return None
+
+    # CFBundleIconFile may leave off the .icns extension
+    name, extension = os.path.splitext(bundle.objectForInfoDictionaryKey_("CFBundleIconFile"))
+
+    return bundle.URLForResource_withExtension_(name, extension[1:] or "icns")
 
 
 class Alert(object):
@@ -280,29 +462,20 @@ class Alert(object):
         self.messageText = messageText
         self.informativeText = ""
         self.buttons = []
-        self.icon = ""
+        self.icon = None
 
     def displayAlert(self):
-        alert = NSAlert.alloc().init()
-        alert.setMessageText_(self.messageText)
-        alert.setInformativeText_(self.informativeText)
-        alert.setAlertStyle_(NSInformationalAlertStyle)
-        for button in self.buttons:
-            alert.addButtonWithTitle_(button)
-
-        if self.icon and os.path.exists(self.icon):
-            icon = NSImage.alloc().initWithContentsOfFile_(self.icon)
-        else:
-            icon = NSImage.alloc().initWithContentsOfFile_(
-                "/System/Library/CoreServices/CoreTypes.bundle/Contents/Resources/AlertStopIcon.icns")
-
-        alert.setIcon_(icon)
-
-        # Don't show the Python rocketship in the dock
-        NSApp.setActivationPolicy_(1)
+        from CoreFoundation import (
+            CFUserNotificationDisplayNotice, kCFUserNotificationStopAlertLevel
+        )
 
-        NSApp.activateIgnoringOtherApps_(True)
-        alert.runModal()
+        # The notice is shown by the user notification agent, so this returns straight
+        # away and works from a LaunchDaemon without a window server connection.
+        # Without an icon file, the stop alert icon is used.
+        CFUserNotificationDisplayNotice(
+            0, kCFUserNotificationStopAlertLevel, self.icon, None, None,
+            self.messageText, self.informativeText, self.buttons[0] if self.buttons else None
+        )
 
 
 def alert(title, message, buttons, app_icon=None):
@@ -311,8 +484,9 @@ def alert(title, message, buttons, app_icon=None):
     Args:
         title (str, required): The title of the alert dialog.
         message (str, required): The message body of the alert dialog.
-        buttons (list, required): Buttons to be displayed on the alert dialog.
-        app_icon (str, optional): The icon to display.  Defaults to:
+        buttons (list, required): Buttons to be displayed on the alert dialog.  Only the
+            first is shown, as the default button.
+        app_icon (NSURL, optional): The icon file to display.  Defaults to the stop alert icon:
             "/System/Library/CoreServices/CoreTypes.bundle/Contents/Resources/AlertStopIcon.icns".
     """
 
@@ -323,8 +497,158 @@ def alert(title, message, buttons, app_icon=None):
     alert_app.displayAlert()
 
 
+def run(preference_domain):
+    """Monitor application launches and block those in the block list.
+
+    PyObjC is only imported here so the install and uninstall actions don't load it.
+
+    Args:
+        preference_domain (str):  The preference domain of the block list
+    """
+
+    from AppKit import NSObject
+    from Foundation import NSDistributedNotificationCenter, NSTimer
+    from libdispatch import (
+        DISPATCH_QUEUE_PRIORITY_BACKGROUND, dispatch_async, dispatch_get_global_queue
+    )
+    from PyObjCTools import AppHelper
+
+    class AppLaunch(NSObject):
+        """Define callback for notification"""
+
+        # The block list lookups are shared by every notification and
+        # only rebuilt when the managed preference domain changes
+        literal_rules = {}
+        regex_pattern = None
+        regex_rules = []
+        regex_prefixes = ()
+
+        def __init__(self):
+            super(NSObject, self).__init__()
+            self.preference_domain = None
+            self.preferences_modified = None
+
+        def preferencesChanged_(self, notification):
+
+            logger.info("Managed preferences changed; reloading the block list...")
+            reload_block_list(self)
+
+        def checkPreferences_(self, timer):
+
+            # The MCX notification is private, so also reload if the managed preferences file changes
+            if get_preferences_modified(self.preference_domain) != self.preferences_modified:
+                logger.info("Managed preferences file changed; reloading the block list...")
+                reload_block_list(self)
+
+        def appLaunched_(self, notification):
+
+            # Read the block list through the class rather than the enclosing scope
+            cls = type(self)
+
+            # Store the userInfo dict from the notification
+            user_info = notification.userInfo()
+
+            # Get the launched applications bundle identifier
+            bundle_identifier = user_info.get("NSApplicationBundleIdentifier")
+
+            # Nothing to check for apps without a bundle identifier or an empty block list
+            if not bundle_identifier or not (cls.literal_rules or cls.regex_rules):
+                return
+
+            # Check if launched app's bundle identifier matches any literal
+            # bundle identifier, falling back to the Regex strings
+            blocked_app = cls.literal_rules.get(bundle_identifier)
+
+            if not blocked_app and bundle_identifier.startswith(cls.regex_prefixes):
+                # The combined pattern reports which Regex string matched, so there's nothing to re-check
+                index = cls.regex_pattern.match(bundle_identifier)
+                if index is not None:
+                    blocked_app = cls.regex_rules[index][1]
+
+            # Nothing else is read from the notification unless the app is blocked
+            if not blocked_app:
+                return
+
+            # Quit launched app before doing anything else
+            os.kill(user_info["NSApplicationProcessIdentifier"], signal.SIGKILL)
+
+            app_name = user_info["NSApplicationName"]
+
+            console_user = get_console_user()
+            logger.info(
+                f"Restricted application '{app_name}' matching bundleID '{bundle_identifier}' was opened by {console_user}.")
+
+            # Get path of launched app
+            path = user_info["NSApplicationPath"]
+
+            # Alert user without waiting for them to dismiss it
+            if blocked_app["AlertUser"]:
+
+                # An app that is about to be deleted may be gone before its icon file is read
+                icon = None if blocked_app["DeleteApp"] else get_app_icon(path)
+
+                alert(blocked_app["AlertTitle"].format(appname=app_name),
+                    blocked_app["AlertMessage"], ["OK"], icon)
+
+            # Delete app if blocked, off the notification thread
+            if blocked_app["DeleteApp"]:
+                dispatch_async(
+                    dispatch_get_global_queue(DISPATCH_QUEUE_PRIORITY_BACKGROUND, 0),
+                    lambda: delete_app(path)
+                )
+
+    def get_preferences_modified(preference_domain):
+        try:
+            return os.stat(f"/Library/Managed Preferences/{preference_domain}.plist").st_mtime
+        except OSError:
+            return None
+
+    def reload_block_list(app_blocker):
+        app_blocker.preferences_modified = get_preferences_modified(app_blocker.preference_domain)
+        (AppLaunch.literal_rules, AppLaunch.regex_pattern, AppLaunch.regex_rules,
+            AppLaunch.regex_prefixes) = load_blocked_apps(app_blocker.preference_domain)
+        observe_launches(app_blocker)
+
+    app_blocker = AppLaunch.new()
+    app_blocker.preference_domain = preference_domain
+
+    # Load the block list once and only reload it when the managed preferences change,
+    # checking the managed preferences file every minute in case the notification never arrives
+    reload_block_list(app_blocker)
+    NSDistributedNotificationCenter.defaultCenter().addObserver_selector_name_object_(
+        app_blocker, "preferencesChanged:",
+        "com.apple.MCX._managementStatusChangedForDomains", None)
+    NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
+        60, app_blocker, "checkPreferences:", None, True)
+
+    logger.info("Starting AppBlocker...")
+
+    # Launch "app", re-entering the event loop a few times rather than
+    # exiting and having launchd start a new interpreter
+    restarts = 0
+
+    while True:
+        try:
+            AppHelper.runConsoleEventLoop(installInterrupt=True)
+            break
+        except Exception:
+            if restarts >= 5:
+                # Exit with an error so launchd's KeepAlive restarts the daemon instead
+                logger.exception("The event loop keeps stopping unexpectedly; exiting...")
+                sys.exit(1)
+
+            logger.exception("The event loop stopped unexpectedly; restarting it...")
+            restarts += 1
+            time.sleep(1)
+
+    logger.info("Stopping AppBlocker...")
+
+
 def main():
 
+    # Initialize logging
+    log_setup()
+
     logger.debug(f"All calling args:  {sys.argv}")
 
     ##################################################
@@ -354,31 +678,42 @@ def main():
     ##################################################
     # Define Variables
 
-    os_minor_version = int(platform.mac_ver()[0].split(".")[1])
     launch_daemon_label = preference_domain
     launch_daemon_location = f"/Library/LaunchDaemons/{launch_daemon_label}.plist"
     script_location = "/usr/local/bin/AppBlocker"
 
+    # The OS Version is only needed to manage the LaunchDaemon
+    if action in ("install", "uninstall"):
+        os_version = get_os_version()
+
     ##################################################
 
     if action == "install":
+        import filecmp
+        import shutil
+
         logger.info("Installing the AppBlocker service...")
 
         if os.path.exists(script_location):
             logger.info("Service already exists; checking version...")
-            dirname, basename = os.path.split(script_location)
-            sys.path.insert(1, dirname)
-            system_name = os.path.splitext(basename)[0]
-            system_instance = importlib.import_module(system_name)
-            system_version = system_instance.__version__
-
-            if system_version == __version__:
+            # Read the version from the installed script rather than importing it
+            with open(script_location) as installed_script:
+                match = re.search(
+                    r'^__version__\s*=\s*["\']([^"\']+)["\']', installed_script.read(), re.MULTILINE)
+            system_version = match.group(1) if match else None
+
+            # Compare the contents as well in case the script changed without a version bump.
+            # The installed copy keeps this script's modification time, so a shallow compare
+            # only reads the files when their sizes match but their modification times don't
+            if system_version == __version__ and (
+                    os.path.samefile(__file__, script_location) or
+                    filecmp.cmp(__file__, script_location)):
                 logger.info("Version:  current")
 
             else:
                 logger.info("Updating the systems' AppBlocker service...")
                 # "Install" script
-                shutil.copy(__file__, script_location)
+                shutil.copy2(__file__, script_location)
 
                 # Create the LaunchDaemon
                 create_daemon(
@@ -387,11 +722,11 @@ def main():
                     launch_daemon_location=launch_daemon_location
                 )
                 stop_daemon(
-                    launch_daemon_label=launch_daemon_label, os_minor_version=os_minor_version)
+                    launch_daemon_label=launch_daemon_label, os_version=os_version)
 
         else:
             # "Install" script
-            shutil.copy(__file__, script_location)
+            shutil.copy2(__file__, script_location)
 
             # Create the LaunchDaemon
             create_daemon(
@@ -399,12 +734,12 @@ def main():
                 launch_daemon_label=launch_daemon_label,
                 launch_daemon_location=launch_daemon_location
             )
-            stop_daemon(launch_daemon_label=launch_daemon_label, os_minor_version=os_minor_version)
+            stop_daemon(launch_daemon_label=launch_daemon_label, os_version=os_version)
 
         start_daemon(
             launch_daemon_label=launch_daemon_label,
             launch_daemon_location=launch_daemon_location,
-            os_minor_version=os_minor_version
+            os_version=os_version
         )
 
     elif action == "uninstall":
@@ -417,23 +752,13 @@ def main():
                 logger.error(f"Error: {error.filename} - {error.strerror}.")
 
         # Stop the LaunchDaemon
-        stop_daemon(launch_daemon_label=launch_daemon_label, os_minor_version=os_minor_version)
+        stop_daemon(launch_daemon_label=launch_daemon_label, os_version=os_version)
 
         if os.path.exists(launch_daemon_location):
             os.remove(launch_daemon_location)
 
     elif action == "run":
-        # Register for 'NSWorkspaceDidLaunchApplicationNotification' notifications
-        notification_center = Foundation.NSWorkspace.sharedWorkspace().notificationCenter()
-        app_blocker = AppLaunch.new()
-        app_blocker.preference_domain = preference_domain
-        notification_center.addObserver_selector_name_object_(
-            app_blocker, "appLaunched:", "NSWorkspaceWillLaunchApplicationNotification", None)
-
-        logger.info("Starting AppBlocker...")
-        # Launch "app"
-        AppHelper.runConsoleEventLoop()
-        logger.info("Stopping AppBlocker...")
+        run(preference_domain)
 
 
 if __name__ == "__main__":